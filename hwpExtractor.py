@@ -1,88 +1,201 @@
+import os
 import re
+import mmap
 import zlib
 import struct
 import olefile
 import zipfile
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+class _StripTable(dict) :
+    # str.translate 용 테이블 (처음 보는 코드포인트만 판정하고 결과를 캐시, None 이면 삭제)
+    # should_strip : 문자를 지울지 판정하는 함수
+    # stripped_ranges : 항상 지우는 코드포인트 구간들 (미리 채워서 판정 자체를 생략)
+    def __init__(self, should_strip, stripped_ranges=()) :
+        self.should_strip = should_strip
+        for stripped in stripped_ranges :
+            self.update(dict.fromkeys(stripped))
+
+    def __missing__(self, cp) :
+        value = None if self.should_strip(chr(cp)) else cp
+        self[cp] = value
+        return value
+
+HWPTAG_PARA_TEXT = 67
+_RECORD_HEADER = struct.Struct("<I")
+_FALLBACK_ENCODINGS = ('utf-8', 'cp949', 'euc-kr')
+_UTF16LE_NEWLINE = "\n".encode('utf-16-le')
+# 섹션 압축 해제 시 출력 버퍼 초기 크기 (압축 크기 대비 배수)
+_INFLATE_RATIO_HINT = 8
+_PARTIAL_DECOMPRESS_STEP = 4096
+
+_CHINESE_RE = re.compile(r'[\u4e00-\u9fff]+')
+# C0 / DEL + C1 제어 문자, CJK 통합 한자
+_C0_RANGE = range(0x00, 0x20)
+_C1_RANGE = range(0x7f, 0xa0)
+_CJK_RANGE = range(0x4e00, 0xa000)
+
+_CONTROL_TABLE = _StripTable(lambda ch: unicodedata.category(ch)[0] == "C",
+                             (_C0_RANGE, _C1_RANGE))
+# 한자 + 제어 문자를 한 번에 제거
+_CLEAN_TABLE = _StripTable(lambda ch: "\u4e00" <= ch <= "\u9fff" or unicodedata.category(ch)[0] == "C",
+                           (_C0_RANGE, _C1_RANGE, _CJK_RANGE))
 
 class hwpExtractor(object) :
     def __init__(self, file) :
         self.file = file
 
     def remove_chinese_characters(self, s: str):
-        return re.sub(r'[\u4e00-\u9fff]+', '', s)
+        return _CHINESE_RE.sub('', s)
 
     def remove_control_characters(self, s):
-        return "".join(ch for ch in s if unicodedata.category(ch)[0] != "C")
+        return s.translate(_CONTROL_TABLE)
 
     def clean_text(self, s: str):
-        s = self.remove_chinese_characters(s)
-        s = self.remove_control_characters(s)
-        return s
+        return s.translate(_CLEAN_TABLE)
     
+    def map_file(self) :
+        # 실제 파일이면 읽기 전용 mmap 으로 연결 (olefile 의 seek/read 가 페이지 캐시 복사로 끝남)
+        try :
+            fileno = self.file.fileno()
+        except (AttributeError, OSError, ValueError) :
+            return None
+
+        try :
+            return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) :
+            return None
+
     def get_text(self) :
+        mapped_file = self.map_file()
         try :
-            ole_file = olefile.OleFileIO(self.file)
+            ole_file = olefile.OleFileIO(mapped_file if mapped_file is not None else self.file)
         except Exception as e:
+            if mapped_file is not None :
+                mapped_file.close()
             return self.get_hwp5_text()
 
+        try :
+            return self.get_ole_text(ole_file)
+        finally :
+            # 호출자가 넘긴 파일은 닫지 않고, 직접 만든 mmap 일 때만 정리
+            if mapped_file is not None :
+                ole_file.close()
+                mapped_file.close()
+
+    def get_ole_text(self, ole_file) :
         dirs = ole_file.listdir()
+        dir_set = {tuple(d) for d in dirs}
 
-        if ["FileHeader"] not in dirs or ["\x05HwpSummaryInformation"] not in dirs:
+        if ("FileHeader",) not in dir_set or ("\x05HwpSummaryInformation",) not in dir_set:
             raise Exception(f"ERROR :: HWPEXTRACTOR :: {self.file.name} is Not a valid HWP OLE file")
         
         header = ole_file.openstream("FileHeader")
         header_data = header.read()
         is_zipped = (header_data[36] & 1) == 1
 
-        section_nums = []
-        for d in dirs:
-            if d[0] == "BodyText":
-                section_nums.append(int(d[1][len("Section"):]))
-        sections = ["BodyText/Section" + str(x) for x in sorted(section_nums)]
+        # 섹션 번호 순으로 정렬 ("Section" 접두어 길이 = 7)
+        body_dirs = sorted((d for d in dirs if d[0] == "BodyText"), key=lambda d: int(d[1][7:]))
+        sections = ["BodyText/" + d[1] for d in body_dirs]
+
+        raw_sections = [ole_file.openstream(section).read() for section in sections]
+
+        # zlib 은 압축 해제 중 GIL 을 놓으므로 섹션별로 병렬 처리
+        if is_zipped and len(raw_sections) > 1:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                sections_data = list(executor.map(self.decompress_section, raw_sections))
+        elif is_zipped:
+            sections_data = [self.decompress_section(data) for data in raw_sections]
+        else:
+            sections_data = raw_sections
 
         text = ""
 
-        for section in sections:
-            bodytext = ole_file.openstream(section)
-            data = bodytext.read()
-            if is_zipped:
-                try:
-                    unzipped_data = zlib.decompress(data, -15)
-                except zlib.error as e:
-                    print(f"ERROR :: HWPEXTRACTOR :: {self.file.name} 압축 해제 실패: {str(e)} >> 일부만 압축 해제 시도 ... ")
-                    unzipped_data = self.partial_decompress(data)
-            else:
-                unzipped_data = data
-
-            section_text = ""
-            i = 0
-            size = len(unzipped_data)
-
-            while i < size :
-                header = struct.unpack_from("<I", unzipped_data, i)[0]
-                rec_type = header & 0x3ff
-                rec_len = (header >> 20) & 0xfff
-
-                if rec_type in [51] :
-                    i += 4 + rec_len
-                    continue
-
-                if rec_type in [67] :
-                    rec_data = unzipped_data[i+4:i+4+rec_len]
-                    section_text += self.decode_text(rec_data)
-                    section_text += "\n"
-
-                i += 4 + rec_len
+        for unzipped_data in sections_data:
+            section_text = self.decode_records(self.scan_para_text(unzipped_data))
 
             cleaned_text = self.clean_text(section_text)
             text += cleaned_text
             text += "\n"
 
-            return text
+        return text
+
+    def decompress_section(self, data):
+        try:
+            return zlib.decompress(data, -15, len(data) * _INFLATE_RATIO_HINT)
+        except zlib.error as e:
+            print(f"ERROR :: HWPEXTRACTOR :: {self.file.name} 압축 해제 실패: {str(e)} >> 일부만 압축 해제 시도 ... ")
+            return self.partial_decompress(data)
+
+    def partial_decompress(self, data):
+        # 손상된 스트림은 오류 지점 직전 청크까지 풀린 데이터만 돌려준다
+        decompressor = zlib.decompressobj(-15)
+        unzipped_data = bytearray()
+        step = _PARTIAL_DECOMPRESS_STEP
+        i = 0
+        size = len(data)
+
+        while i < size :
+            try:
+                unzipped_data += decompressor.decompress(data[i:i+step])
+            except zlib.error:
+                break
+            if decompressor.eof :
+                break
+            i += step
+
+        return bytes(unzipped_data)
         
+    def scan_para_text(self, data):
+        # 레코드 헤더만 훑어서 PARA_TEXT 레코드 데이터만 돌려준다
+        unpack_header = _RECORD_HEADER.unpack_from
+        records = []
+        i = 0
+        size = len(data)
+
+        while i + 4 <= size :
+            header = unpack_header(data, i)[0]
+            rec_type = header & 0x3ff
+            # 헤더는 32bit 이므로 상위 12bit 는 shift 만으로 충분 (0xfff 면 확장 크기)
+            rec_len = header >> 20
+            i += 4
+
+            if rec_len == 0xfff :
+                if i + 4 > size :
+                    break
+                rec_len = unpack_header(data, i)[0]
+                i += 4
+
+            if rec_type == HWPTAG_PARA_TEXT :
+                records.append(data[i:i+rec_len])
+
+            i += rec_len
+
+        return records
+
+    def decode_records(self, records):
+        # 레코드마다 "\n" 을 붙여 이어 붙인 텍스트를 만든다
+        if not records :
+            return ""
+
+        # 모든 레코드가 UTF-16 정렬이면 한 번에 디코딩, 실패하면 레코드별로 디코딩
+        if not any(len(rec_data) & 1 for rec_data in records) :
+            try:
+                return (_UTF16LE_NEWLINE.join(records) + _UTF16LE_NEWLINE).decode('utf-16-le')
+            except UnicodeDecodeError:
+                pass
+
+        return "".join([self.decode_text(rec_data) + "\n" for rec_data in records])
+
     def decode_text(self, rec_data):
-        for encoding in ['utf-16', 'utf-8', 'cp949', 'euc-kr']:
+        # PARA_TEXT 는 스펙상 UTF-16LE 이므로 BOM 검사 없이 바로 디코딩
+        try:
+            return rec_data.decode('utf-16-le')
+        except UnicodeDecodeError:
+            pass
+
+        for encoding in _FALLBACK_ENCODINGS:
             try:
                 return rec_data.decode(encoding)
             except UnicodeDecodeError as e:
@@ -107,24 +220,7 @@ class hwpExtractor(object) :
                     except zlib.error:
                         unzipped_data = data
 
-                    section_text = ""
-                    i = 0
-                    size = len(unzipped_data)
-                    while i < size:
-                        header = struct.unpack_from("<I", unzipped_data, i)[0]
-                        rec_type = header & 0x3ff
-                        rec_len = (header >> 20) & 0xfff
-
-                        if rec_type in [51] :
-                            i += 4 + rec_len
-                            continue
-
-                        if rec_type in [67] :
-                            rec_data = unzipped_data[i+4:i+4+rec_len]
-                            section_text += self.decode_text(rec_data)
-                            section_text += "\n"
-
-                        i += 4 + rec_len
+                    section_text = self.decode_records(self.scan_para_text(unzipped_data))
 
                     cleaned_text = self.clean_text(section_text)
                     text += cleaned_text
@@ -1,10 +1,81 @@
 import os
 import struct
 from typing import List, Dict, Any, Tuple
-from io import BytesIO
+from io import BytesIO, BufferedReader
 from PIL import Image
 import base64
 
+
+class _StripTable(dict):
+    """str.translate용 테이블 (처음 보는 코드포인트만 판정하고 결과를 캐시, None이면 삭제)"""
+    
+    def __init__(self, should_strip, stripped_ranges=()):
+        """
+        Args:
+            should_strip: 문자를 지울지 판정하는 함수
+            stripped_ranges: 항상 지우는 코드포인트 구간들 (미리 채워서 판정 자체를 생략)
+        """
+        self.should_strip = should_strip
+        for stripped in stripped_ranges:
+            self.update(dict.fromkeys(stripped))
+    
+    def __missing__(self, cp: int):
+        value = None if self.should_strip(chr(cp)) else cp
+        self[cp] = value
+        return value
+
+
+# 레코드 헤더 (tag 10bit, level 10bit, size 12bit)
+_RECORD_HEADER = struct.Struct('<I')
+HWPTAG_PARA_TEXT = 67
+
+
+def _is_unprintable(ch: str) -> bool:
+    return not (ch.isprintable() or ch.isspace())
+
+
+# 출력 가능 문자와 공백만 남기는 테이블 (BMP의 제거 대상은 미리 계산, 약 1만 개)
+_UNPRINTABLE_TABLE = _StripTable(_is_unprintable,
+                                 ([cp for cp in range(0x10000) if _is_unprintable(chr(cp))],))
+
+
+# _import_etree 가 고른 XML 모듈 (실패한 import 는 캐시되지 않으므로 처음 고른 결과를 저장)
+_ETREE = None
+
+
+def _import_etree():
+    """lxml.etree가 있으면 lxml.etree, 없으면 xml.etree.ElementTree 반환 (처음 고른 모듈을 재사용)"""
+    global _ETREE
+    if _ETREE is None:
+        try:
+            from lxml import etree
+        except ImportError:
+            from xml.etree import ElementTree as etree
+        _ETREE = etree
+    return _ETREE
+
+
+def _iterparse(etree, source, events):
+    """
+    iterparse 래퍼. lxml이면 내부 DTD 엔티티만 풀고 외부 엔티티(XXE)와 네트워크 접근은 막으며
+    주석 / PI는 버림 (ElementTree와 같은 결과, lxml 5.0 미만에는 'internal' 옵션이 없어 resolver로 외부 엔티티를 거부)
+    """
+    if etree.__name__ != 'lxml.etree':
+        return etree.iterparse(source, events=events)
+    
+    options = {'no_network': True, 'remove_comments': True, 'remove_pis': True}
+    if etree.LXML_VERSION >= (5,):
+        return etree.iterparse(source, events=events, resolve_entities='internal', **options)
+    
+    class ExternalEntityBlocker(etree.Resolver):
+        def resolve(self, url, pubid, context):
+            raise ValueError(f"외부 엔티티는 허용하지 않음: {url}")
+    
+    context = etree.iterparse(source, events=events, **options)
+    context.resolvers.add(ExternalEntityBlocker())
+    return context
+
+
 class HWPTextExtractor:
     """한글 문서에서 텍스트, 이미지, 표를 추출하는 클래스"""
     
@@ -14,14 +85,30 @@ class HWPTextExtractor:
     HWP_VERSION_5X = 5
     HWP_VERSION_HWPX = 6
     
-    def __init__(self, vlm_endpoint_url: str):
+    # VLM 동시 요청 수
+    VLM_MAX_WORKERS = 8
+    
+    # HWPX 섹션 XML 읽기 버퍼 크기
+    XML_READ_BUFFER_SIZE = 1 << 20
+    
+    # 섹션 XML 태그 분류 (_parse_section_xml)
+    _TAG_OTHER = 0
+    _TAG_TEXT = 1
+    _TAG_TABLE = 2
+    _TAG_IMAGE = 3
+    
+    def __init__(self, vlm_endpoint_url: str, vlm_multipart: bool = False):
         """
         Args:
             vlm_endpoint_url: VLM API 엔드포인트 URL
+            vlm_multipart: True면 이미지를 base64 JSON 대신 multipart/form-data 원본 바이트로 전송
+                (엔드포인트가 multipart 업로드를 지원해야 함)
         """
         self.vlm_endpoint = vlm_endpoint_url
+        self.vlm_multipart = vlm_multipart
         self.results = []
         self.file_version = self.HWP_VERSION_UNKNOWN
+        self._session = None
     
     def detect_hwp_version(self, file_path: str) -> int:
         """
@@ -45,9 +132,9 @@ class HWPTextExtractor:
                 # HWP 5.0 이상 시그니처 확인 (CFB/OLE 파일)
                 # CFB 파일은 0xD0CF11E0A1B11AE1로 시작
                 if signature[:8] == b'\xD0\xCF\x11\xE0\xA1\xB1\x1A\xE1':
-                    # OLE 파일이므로 HWP 5.0 확인
-                    f.seek(0)
-                    return self._verify_hwp5_signature(f)
+                    # OLE 파일이면 HWP 5.0으로 판단
+                    # (OLE 전체 파싱은 비용이 크므로 FileHeader 확인은 실제 추출 시 한 번만 수행)
+                    return self.HWP_VERSION_5X
                 
                 # HWP 3.0 시그니처 확인
                 # HWP 3.0은 "HWP Document File"로 시작
@@ -61,50 +148,26 @@ class HWPTextExtractor:
             print(f"버전 감지 중 오류 발생: {e}")
             return self.HWP_VERSION_UNKNOWN
     
-    def _verify_hwp5_signature(self, f) -> int:
+    def _print_hwp5_version(self, header_data: bytes) -> None:
         """
-        HWP 5.0 파일의 시그니처를 상세히 확인
+        HWP 5.0 FileHeader에서 버전 정보를 읽어 출력
         
         Args:
-            f: 파일 객체
-            
-        Returns:
-            버전 코드
+            header_data: FileHeader 스트림 데이터
         """
-        try:
-            import olefile
-            
-            f.seek(0)
-            ole = olefile.OleFileIO(f)
-            
-            # FileHeader 스트림 확인
-            if ole.exists('FileHeader'):
-                header_stream = ole.openstream('FileHeader')
-                header_data = header_stream.read()
-                
-                # HWP 5.0 시그니처 확인 (32바이트)
-                # 서명: "HWP Document File" (앞 16바이트)
-                if header_data[:16] == b'HWP Document Fil':
-                    # 버전 정보 읽기 (offset 16~20)
-                    version_bytes = header_data[16:20]
-                    if len(version_bytes) == 4:
-                        version = struct.unpack('<I', version_bytes)[0]
-                        major = (version >> 24) & 0xFF
-                        minor = (version >> 16) & 0xFF
-                        micro = (version >> 8) & 0xFF
-                        build = version & 0xFF
-                        
-                        print(f"HWP 버전 감지: {major}.{minor}.{micro}.{build}")
-                        
-                        if major == 5:
-                            return self.HWP_VERSION_5X
+        # HWP 5.0 시그니처 확인 (32바이트)
+        # 서명: "HWP Document File" (앞 16바이트)
+        if header_data[:16] == b'HWP Document Fil':
+            # 버전 정보 읽기 (offset 16~20)
+            version_bytes = header_data[16:20]
+            if len(version_bytes) == 4:
+                version = struct.unpack('<I', version_bytes)[0]
+                major = (version >> 24) & 0xFF
+                minor = (version >> 16) & 0xFF
+                micro = (version >> 8) & 0xFF
+                build = version & 0xFF
                 
-            ole.close()
-            return self.HWP_VERSION_5X
-            
-        except Exception as e:
-            print(f"HWP 5.0 시그니처 확인 실패: {e}")
-            return self.HWP_VERSION_5X
+                print(f"HWP 버전 감지: {major}.{minor}.{micro}.{build}")
     
     def extract_from_hwp(self, hwp_file_path: str) -> List[str]:
         """
@@ -171,11 +234,11 @@ class HWPTextExtractor:
                 try:
                     text = content.decode('cp949', errors='ignore')
                     # 제어 문자 제거
-                    text = ''.join(char for char in text if char.isprintable() or char.isspace())
+                    text = text.translate(_UNPRINTABLE_TABLE).strip()
                     
                     # 간단히 한 페이지로 처리 (3.0은 페이지 구분이 명확하지 않음)
-                    if text.strip():
-                        page_results.append(text.strip())
+                    if text:
+                        page_results.append(text)
                 except Exception as e:
                     print(f"HWP 3.0 텍스트 디코딩 실패: {e}")
                 
@@ -200,6 +263,7 @@ class HWPTextExtractor:
             if ole.exists('FileHeader'):
                 header_stream = ole.openstream('FileHeader')
                 header_data = header_stream.read()
+                self._print_hwp5_version(header_data)
                 
                 # 압축 여부 확인 (속성 플래그)
                 flags = struct.unpack('<I', header_data[36:40])[0]
@@ -208,9 +272,16 @@ class HWPTextExtractor:
                 print(f"문서 압축 여부: {'압축됨' if is_compressed else '압축 안 됨'}")
             
             # BodyText 섹션 처리
-            sections = [s for s in ole.listdir() if s[0] == 'BodyText']
+            dirs = ole.listdir()
+            sections = [s for s in dirs if s[0] == 'BodyText']
             
-            for section in sorted(sections):
+            # 이미지는 문서 전체에서 한 번만 추출/VLM 처리하고 결과는 첫 페이지에 붙임
+            vlm_texts = []
+            if sections:
+                images = self._extract_images_from_ole(ole, dirs)
+                vlm_texts = [t for t in self._process_images_with_vlm(images) if t]
+            
+            for page_index, section in enumerate(sorted(sections)):
                 page_content = []
                 
                 try:
@@ -232,12 +303,8 @@ class HWPTextExtractor:
                 except Exception as e:
                     print(f"섹션 {section} 처리 중 오류: {e}")
                 
-                # 이미지 추출 및 VLM 처리
-                images = self._extract_images_from_ole(ole)
-                for img_data in images:
-                    vlm_text = self._process_image_with_vlm(img_data)
-                    if vlm_text:
-                        page_content.append(vlm_text)
+                if page_index == 0:
+                    page_content.extend(vlm_texts)
                 
                 page_results.append("\n".join(page_content) if page_content else "")
             
@@ -248,53 +315,59 @@ class HWPTextExtractor:
         
         return page_results if page_results else [""]
     
+    def _scan_para_text(self, data: bytes) -> List[Tuple[int, int]]:
+        """
+        레코드 헤더만 훑어서 텍스트 레코드(HWPTAG_PARA_TEXT = 67)의 위치를 찾음
+        
+        Returns:
+            (데이터 시작 오프셋, 크기) 리스트
+        """
+        spans = []
+        offset = 0
+        data_len = len(data)
+        unpack_header = _RECORD_HEADER.unpack_from
+        
+        while offset < data_len - 4:
+            # 레코드 헤더 읽기 (4바이트)
+            record_header = unpack_header(data, offset)[0]
+            offset += 4
+            
+            # 레코드 태그 및 크기 추출 (레벨은 사용하지 않음)
+            tag_id = record_header & 0x3FF
+            size = record_header >> 20  # 32bit 헤더의 상위 12bit
+            
+            if size == 0xFFF:  # 확장 크기
+                if offset + 4 > data_len:
+                    break
+                size = unpack_header(data, offset)[0]
+                offset += 4
+            
+            if offset + size > data_len:
+                break
+            
+            if tag_id == HWPTAG_PARA_TEXT:
+                spans.append((offset, size))
+            offset += size
+        
+        return spans
+    
     def _parse_hwp5_text(self, data: bytes) -> str:
         """
         HWP 5.0 바이너리에서 텍스트 파싱
         HWP 5.0은 레코드 구조로 되어 있음
         """
         texts = []
-        offset = 0
         
         try:
-            while offset < len(data) - 4:
-                # 레코드 헤더 읽기 (4바이트)
-                if offset + 4 > len(data):
-                    break
-                
-                record_header = struct.unpack('<I', data[offset:offset+4])[0]
-                offset += 4
-                
-                # 레코드 태그 및 레벨, 크기 추출
-                tag_id = record_header & 0x3FF
-                level = (record_header >> 10) & 0x3FF
-                size = (record_header >> 20) & 0xFFF
-                
-                if size == 0xFFF:  # 확장 크기
-                    if offset + 4 > len(data):
-                        break
-                    size = struct.unpack('<I', data[offset:offset+4])[0]
-                    offset += 4
-                
-                # 레코드 데이터 읽기
-                if offset + size > len(data):
-                    break
-                
-                record_data = data[offset:offset+size]
-                offset += size
-                
-                # 텍스트 레코드 처리 (HWPTAG_PARA_TEXT = 67)
-                if tag_id == 67:
-                    try:
-                        # UTF-16LE로 디코딩
-                        text = record_data.decode('utf-16le', errors='ignore')
-                        # 제어 문자 제거
-                        text = ''.join(char for char in text if char.isprintable() or char.isspace())
-                        if text.strip():
-                            texts.append(text.strip())
-                    except:
-                        pass
-                        
+            # 텍스트 레코드만 잘라서 처리
+            for offset, size in self._scan_para_text(data):
+                # UTF-16LE로 디코딩 (errors='ignore'이므로 예외 없음)
+                text = data[offset:offset+size].decode('utf-16le', errors='ignore')
+                # 제어 문자 제거 후 공백 정리
+                text = text.translate(_UNPRINTABLE_TABLE).strip()
+                if text:
+                    texts.append(text)
+                    
         except Exception as e:
             print(f"레코드 파싱 중 오류: {e}")
         
@@ -303,7 +376,6 @@ class HWPTextExtractor:
     def _extract_from_hwpx(self, hwpx_path: str) -> List[str]:
         """HWPX 파일 처리 (ZIP 기반)"""
         import zipfile
-        from xml.etree import ElementTree as ET
         
         page_results = []
         
@@ -314,25 +386,17 @@ class HWPTextExtractor:
             for section_file in sorted(section_files):
                 page_content = []
                 
-                xml_content = hwpx.read(section_file)
-                root = ET.fromstring(xml_content)
+                # 텍스트, 이미지, 표를 스트리밍으로 한 번에 추출
+                # (큰 버퍼로 감싸서 압축 해제를 파서의 작은 read 단위가 아닌 큰 덩어리로 수행)
+                with hwpx.open(section_file) as raw_file, \
+                        BufferedReader(raw_file, buffer_size=self.XML_READ_BUFFER_SIZE) as xml_file:
+                    text_content, images, tables = self._parse_section_xml(hwpx, xml_file)
                 
-                # 텍스트 추출
-                text_content = self._extract_text_from_xml(root)
                 if text_content:
                     page_content.append(text_content)
                 
-                # 이미지 추출 및 VLM 처리
-                images = self._extract_images_from_section(hwpx, root)
-                for img_data in images:
-                    vlm_text = self._process_image_with_vlm(img_data)
-                    if vlm_text:
-                        page_content.append(vlm_text)
-                
-                # 표 추출 및 VLM 처리
-                tables = self._extract_tables_from_xml(hwpx, root)
-                for table_img in tables:
-                    vlm_text = self._process_image_with_vlm(table_img)
+                # 이미지와 표를 한 번에 VLM 처리 (결과 순서는 이미지 → 표)
+                for vlm_text in self._process_images_with_vlm(images + tables):
                     if vlm_text:
                         page_content.append(vlm_text)
                 
@@ -340,49 +404,106 @@ class HWPTextExtractor:
         
         return page_results
     
-    def _extract_text_from_xml(self, root: Any) -> str:
-        """XML에서 텍스트 추출"""
+    def _parse_section_xml(self, hwpx_zip, xml_file) -> Tuple[str, List[bytes], List[bytes]]:
+        """
+        섹션 XML을 iterparse로 한 번만 훑어서 텍스트, 이미지, 표를 추출
+        처리가 끝난 요소는 바로 비워서 문서 전체 트리를 메모리에 들고 있지 않음
+        
+        Args:
+            hwpx_zip: HWPX ZipFile 객체
+            xml_file: 섹션 XML 파일 객체
+            
+        Returns:
+            (텍스트, 이미지 데이터 리스트, 표 이미지 리스트)
+        """
+        ET = _import_etree()
+        
         texts = []
-        # hp:t 태그에서 텍스트 추출
-        for text_elem in root.iter():
-            if text_elem.tag.endswith('t') and text_elem.text:
-                texts.append(text_elem.text)
-        return " ".join(texts)
-    
-    def _extract_images_from_section(self, hwpx_zip, root: Any) -> List[bytes]:
-        """섹션에서 이미지 추출"""
-        images = []
-        for img_elem in root.iter():
-            if 'Pic' in img_elem.tag or 'Image' in img_elem.tag:
-                img_id = img_elem.get('BinItemID') or img_elem.get('href')
-                if img_id:
-                    try:
-                        img_path = f'bindata/{img_id}'
-                        if img_path in hwpx_zip.namelist():
-                            img_data = hwpx_zip.read(img_path)
-                            images.append(img_data)
-                    except:
-                        pass
-        return images
-    
-    def _extract_tables_from_xml(self, hwpx_zip, root: Any) -> List[bytes]:
-        """표를 이미지로 변환하여 추출"""
+        img_ids = []
         table_images = []
+        # 표 내부 요소는 표 렌더링이 끝날 때까지 비우지 않음
+        table_depth = 0
+        # 태그별 분류 결과 (태그 종류는 수십 개뿐이므로 요소마다 문자열 검사를 반복하지 않음)
+        tag_kinds = {}
         
-        for table_elem in root.iter():
-            if 'tbl' in table_elem.tag.lower():
-                table_img = self._render_table_to_image(table_elem)
-                if table_img:
-                    table_images.append(table_img)
+        for event, elem in _iterparse(ET, xml_file, ('start', 'end')):
+            tag = elem.tag
+            kind = tag_kinds.get(tag)
+            if kind is None:
+                kind = tag_kinds[tag] = self._classify_tag(tag)
+            
+            if event == 'start':
+                if kind == self._TAG_TABLE:
+                    table_depth += 1
+                # 이미지 ID는 시작 태그의 속성에서 읽음 (문서 순서 유지)
+                elif kind == self._TAG_IMAGE:
+                    img_id = elem.get('BinItemID') or elem.get('href')
+                    if img_id:
+                        img_ids.append(img_id)
+                continue
+            
+            # hp:t 태그에서 텍스트 추출 (네임스페이스 무관하게 로컬 이름이 t인 요소)
+            if kind == self._TAG_TEXT:
+                if elem.text:
+                    texts.append(elem.text)
+            elif kind == self._TAG_TABLE:
+                table_depth -= 1
+                if table_depth == 0:
+                    # 가장 바깥 표가 닫히면 중첩 표까지 문서 순서대로 렌더링
+                    for table_elem in elem.iter():
+                        if tag_kinds.get(table_elem.tag) == self._TAG_TABLE:
+                            table_img = self._render_table_to_image(table_elem)
+                            if table_img:
+                                table_images.append(table_img)
+            
+            if table_depth == 0:
+                elem.clear()
         
-        return table_images
+        images = self._read_bindata_images(hwpx_zip, img_ids)
+        return " ".join(texts), images, table_images
+    
+    def _classify_tag(self, tag: str) -> int:
+        """iterparse 태그 이름을 텍스트 / 표 / 이미지 / 기타로 분류"""
+        if tag == 't' or tag.endswith('}t'):
+            return self._TAG_TEXT
+        if 'tbl' in tag.lower():
+            return self._TAG_TABLE
+        if 'Pic' in tag or 'Image' in tag:
+            return self._TAG_IMAGE
+        return self._TAG_OTHER
     
-    def _extract_images_from_ole(self, ole) -> List[bytes]:
-        """OLE 파일에서 이미지 추출"""
+    def _read_bindata_images(self, hwpx_zip, img_ids: List[str]) -> List[bytes]:
+        """BinItemID 목록에 해당하는 이미지를 bindata에서 읽음"""
+        images = []
+        if not img_ids:
+            return images
+        
+        names = set(hwpx_zip.namelist())
+        for img_id in img_ids:
+            try:
+                img_path = f'bindata/{img_id}'
+                if img_path in names:
+                    img_data = hwpx_zip.read(img_path)
+                    images.append(img_data)
+            except:
+                pass
+        return images
+    
+    def _extract_images_from_ole(self, ole, dirs: List[List[str]] = None) -> List[bytes]:
+        """
+        OLE 파일에서 이미지 추출
+        
+        Args:
+            ole: OleFileIO 객체
+            dirs: 이미 읽어 둔 ole.listdir() 결과 (없으면 새로 읽음)
+        """
         images = []
         
         try:
-            bin_data_dirs = [d for d in ole.listdir() if d[0] == 'BinData']
+            if dirs is None:
+                dirs = ole.listdir()
+            # BinData/<이름> 형태의 스트림만 대상
+            bin_data_dirs = [d for d in dirs if len(d) == 2 and d[0] == 'BinData']
             for bin_dir in bin_data_dirs:
                 try:
                     stream = ole.openstream(bin_dir)
@@ -400,21 +521,60 @@ class HWPTextExtractor:
         # 실제 구현에서는 HTML로 변환 후 screenshot 등을 활용
         return None
     
+    def _get_session(self):
+        """VLM 요청용 requests.Session (keep-alive / 커넥션 풀 재사용)"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.VLM_MAX_WORKERS,
+                                  pool_maxsize=self.VLM_MAX_WORKERS)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session = session
+        return self._session
+    
+    def _process_images_with_vlm(self, images: List[bytes]) -> List[str]:
+        """여러 이미지를 스레드 풀로 동시에 VLM 처리 (입력 순서대로 결과 반환)"""
+        if not images:
+            return []
+        
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # 세션은 스레드 풀 시작 전에 한 번만 생성
+        self._get_session()
+        
+        if len(images) == 1:
+            return [self._process_image_with_vlm(images[0])]
+        
+        with ThreadPoolExecutor(max_workers=min(self.VLM_MAX_WORKERS, len(images))) as pool:
+            return list(pool.map(self._process_image_with_vlm, images))
+    
     def _process_image_with_vlm(self, img_data: bytes) -> str:
         """VLM을 사용하여 이미지에서 텍스트 추출"""
-        import requests
+        session = self._get_session()
         
         try:
-            img_base64 = base64.b64encode(img_data).decode('utf-8')
-            
-            response = requests.post(
-                self.vlm_endpoint,
-                json={
-                    "image": img_base64,
-                    "task": "text_extraction"
-                },
-                timeout=30
-            )
+            if self.vlm_multipart:
+                # 원본 바이트 그대로 전송 (base64 인코딩/33% 크기 증가 없음)
+                response = session.post(
+                    self.vlm_endpoint,
+                    files={'image': ('image.bin', img_data, 'application/octet-stream')},
+                    data={'task': 'text_extraction'},
+                    timeout=30
+                )
+            else:
+                img_base64 = base64.b64encode(img_data).decode('ascii')
+                
+                response = session.post(
+                    self.vlm_endpoint,
+                    json={
+                        "image": img_base64,
+                        "task": "text_extraction"
+                    },
+                    timeout=30
+                )
             
             if response.status_code == 200:
                 result = response.json()
@@ -1,75 +1,365 @@
+import os
+import re
+import mmap
 import zlib
 import struct
 import zipfile
-import xml.etree.ElementTree as ET
+import itertools
+from xml.parsers import expat
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+HP = 'http://www.hancom.co.kr/hwpml/2011/paragraph'
+# hp:t 의 Clark 표기 태그 (iter 에서 네임스페이스 해석 없이 바로 비교)
+TAG_T = '{%s}t' % HP
+
+# ZIP local file header 시그니처 (.hwpx 는 항상 이 헤더로 시작)
+_ZIP_MAGIC = b'PK\x03\x04'
+
+# local file header : 고정 30바이트, 오프셋 26 에 파일 이름 길이 / extra 필드 길이
+_LOCAL_HEADER_SIZE = 30
+_LOCAL_HEADER_LENGTHS = struct.Struct('<HH')
+_ZIP_FLAG_ENCRYPTED = 0x1
+
+# 정규식 fast path : hp 접두어 선언, hp:t 시작 태그, 텍스트만 들어있는 hp:t, XML 선언의 인코딩
+_HP_XMLNS_DQ = ('xmlns:hp="%s"' % HP).encode()
+_HP_XMLNS_SQ = ("xmlns:hp='%s'" % HP).encode()
+# 값과 상관없이 hp 접두어를 선언하는 모든 곳 (안쪽 요소에서 다시 선언하는 경우 확인용)
+_HP_PREFIX_DECL_RE = re.compile(rb'xmlns:hp\s*=')
+_T_OPEN_RE = re.compile(rb'<hp:t[\s/>]')
+_T_SIMPLE_RE = re.compile(rb'<hp:t(?:\s+[\w.:-]+\s*=\s*(?:"[^"]*"|\'[^\']*\'))*\s*(?:/>|>([^<]*)</hp:t\s*>)')
+_HP_URI = HP.encode()
+# 닫는 태그는 </hp:t > 처럼 이름 뒤에 공백이 올 수 있으므로 접두부만 찾고 '>' 까지를 포함
+_T_CLOSE = b'</hp:t'
+_XML_ENCODING_RE = re.compile(rb'(?:\xef\xbb\xbf)?<\?xml[^>]*?encoding\s*=\s*["\']([\w.-]+)')
+_XML_REF_RE = re.compile(r'&(?:(lt|gt|amp|quot|apos)|#([0-9]+)|#x([0-9a-fA-F]+));')
+_XML_ENTITIES = {'lt': '<', 'gt': '>', 'amp': '&', 'quot': '"', 'apos': "'"}
+
+def _unescape_ref(match):
+    name, dec, hexa = match.groups()
+    if name:
+        return _XML_ENTITIES[name]
+    return chr(int(dec) if dec else int(hexa, 16))
+
+# expat 문자 데이터 버퍼 크기
+_EXPAT_BUFFER_SIZE = 1 << 16
+
+# iter_text 에서 섹션을 압축 해제하며 파서에 넘기는 조각 크기
+_STREAM_CHUNK_SIZE = 1 << 16
+
+# 모듈 로드 시 한 번만 컴파일하는 XPath : hp:t 의 첫 자식이 텍스트 노드일 때 그 값 (= element.text)
+# 주석 / PI 는 _LXML_PARSER 가 버리므로 그 앞뒤 텍스트는 하나의 텍스트 노드로 합쳐짐
+if etree is not None:
+    _XP_T = etree.XPath('//hp:t/node()[1][self::text()]',
+                        namespaces={'hp': HP},
+                        smart_strings=False)
+
+    class _ExternalEntityBlocker(etree.Resolver):
+        # lxml 5.0 미만 : 외부 엔티티를 불러오려 하면 파싱 오류로 처리
+        def resolve(self, url, pubid, context):
+            raise ValueError("외부 엔티티는 허용하지 않음 : %s" % url)
+
+    # 외부에서 받은 문서이므로 내부 DTD 엔티티만 풀고 외부 엔티티(XXE)와 네트워크 접근은 막음
+    # (expat / ElementTree 와 같은 결과) lxml 5.0 미만에는 'internal' 이 없으므로 resolver 로 막음
+    _LXML_BLOCK_EXTERNAL = etree.LXML_VERSION < (5,)
+    # 요소 안의 주석 / PI 는 파싱 단계에서 버려서 hp:t 의 텍스트가 끊기지 않게 함 (ElementTree 와 같은 결과)
+    _LXML_OPTIONS = {'resolve_entities': True if _LXML_BLOCK_EXTERNAL else 'internal',
+                     'no_network': True,
+                     'remove_comments': True,
+                     'remove_pis': True}
+
+    def _lxml_safe(parser):
+        if _LXML_BLOCK_EXTERNAL:
+            parser.resolvers.add(_ExternalEntityBlocker())
+        return parser
+
+    _LXML_PARSER = _lxml_safe(etree.XMLParser(**_LXML_OPTIONS))
+else:
+    _XP_T = None
+    _LXML_PARSER = None
+
+class _NotZipError(ValueError):
+    pass
+
+class _NoSectionError(ValueError):
+    pass
 
 class hwpxExtractor(object) :
+    # 텍스트를 꺼낼 후보 파일 (앞에서부터 먼저 있는 것을 사용)
+    CANDIDATES = ('Contents/section0.xml', 'BodyText/section0.xml', 'Contents/content.hpf')
+
+    # 네임스페이스 맵 (변경 불가, 모든 인스턴스가 공유)
+    NAMESPACES = MappingProxyType({
+        'opf': 'http://www.idpf.org/2007/opf/',
+        'hp': HP,
+        'hp10': 'http://www.hancom.co.kr/hwpml/2016/paragraph',
+        'ha' : "http://www.hancom.co.kr/hwpml/2011/app",
+        'hs' :"http://www.hancom.co.kr/hwpml/2011/section",
+        'hc' : "http://www.hancom.co.kr/hwpml/2011/core" ,
+        'hh' : "http://www.hancom.co.kr/hwpml/2011/head" ,
+        'hhs' : "http://www.hancom.co.kr/hwpml/2011/history", 
+        'hm' : "http://www.hancom.co.kr/hwpml/2011/master-page" ,
+        'hpf' : "http://www.hancom.co.kr/schema/2011/hpf" ,
+        'dc' : "http://purl.org/dc/elements/1.1/" ,
+        'ooxmlchart' : "http://www.hancom.co.kr/hwpml/2016/ooxmlchart" ,
+        'hwpunitchar' : "http://www.hancom.co.kr/hwpml/2016/HwpUnitChar",
+        'epub' : "http://www.idpf.org/2007/ops" ,
+        'config' : "urn:oasis:names:tc:opendocument:xmlns:config:1.0" 
+        # 다른 네임스페이스가 있을 수 있습니다. 필요에 따라 추가하세요.
+    })
+
     def __init__(self, file) :
         self.hwpx = file
-        self.namespaces = {
-            'opf': 'http://www.idpf.org/2007/opf/',
-            'hp': 'http://www.hancom.co.kr/hwpml/2011/paragraph',
-            'hp10': 'http://www.hancom.co.kr/hwpml/2016/paragraph',
-            'ha' : "http://www.hancom.co.kr/hwpml/2011/app",
-            'hs' :"http://www.hancom.co.kr/hwpml/2011/section",
-            'hc' : "http://www.hancom.co.kr/hwpml/2011/core" ,
-            'hh' : "http://www.hancom.co.kr/hwpml/2011/head" ,
-            'hhs' : "http://www.hancom.co.kr/hwpml/2011/history", 
-            'hm' : "http://www.hancom.co.kr/hwpml/2011/master-page" ,
-            'hpf' : "http://www.hancom.co.kr/schema/2011/hpf" ,
-            'dc' : "http://purl.org/dc/elements/1.1/" ,
-            'ooxmlchart' : "http://www.hancom.co.kr/hwpml/2016/ooxmlchart" ,
-            'hwpunitchar' : "http://www.hancom.co.kr/hwpml/2016/HwpUnitChar",
-            'epub' : "http://www.idpf.org/2007/ops" ,
-            'config' : "urn:oasis:names:tc:opendocument:xmlns:config:1.0" 
-            # 다른 네임스페이스가 있을 수 있습니다. 필요에 따라 추가하세요.
-        }
+        # 추출 결과 캐시 (성공한 경우만 저장)
+        self._cached_text = None
+
+    def _texts(self, data):
+        # 섹션 XML bytes 에서 hp:t 텍스트 리스트 추출
+        # 마지막 </hp:t> 이후(스타일, 메타데이터, </hs:sec> 등)는 텍스트가 없으므로 스캔하지 않음
+        end = self._text_end(data)
+
+        # 단순한 형태의 섹션은 XML 파서 없이 정규식으로 바로 추출
+        if end is not None:
+            texts = self._fast_texts(data, end)
+            if texts is not None:
+                return texts
+
+        # 섹션 XML 전체를 bytes 로 받아 한 번에 파싱
+        if _XP_T is not None:
+            # lxml : 미리 컴파일한 XPath 한 번 호출로 문자열 리스트를 받음
+            return _XP_T(etree.fromstring(data, _LXML_PARSER))
+
+        return self._expat_texts(data, end)
+
+    def _text_end(self, data):
+        # 문서에서 hp 네임스페이스가 hp 접두어로 한 번만 선언된 경우 마지막 </hp:t> 의 끝 위치 ('>' 다음)
+        # 다른 접두어로도 선언되어 있거나 안쪽 요소에서 hp 접두어를 다시 선언하면
+        # hp:t 만 찾아서는 안 되므로 None
+        if data.count(_HP_URI) != 1 or (_HP_XMLNS_DQ not in data and _HP_XMLNS_SQ not in data):
+            return None
+        if len(_HP_PREFIX_DECL_RE.findall(data)) != 1:
+            return None
+        pos = data.rfind(_T_CLOSE)
+        if pos < 0:
+            return None
+        pos = data.find(b'>', pos + len(_T_CLOSE))
+        if pos < 0:
+            return None
+        return pos + 1
+
+    def _fast_texts(self, data, end):
+        # 모든 hp:t 가 <hp:t ...>텍스트</hp:t> 또는 <hp:t/> 형태일 때만 정규식으로 추출
+        # 조건이 맞지 않으면 None 을 돌려주고 XML 파서로 처리
+        if data.find(b'<!--', 0, end) >= 0 or data.find(b'<![CDATA[', 0, end) >= 0:
+            return None
+        decl = _XML_ENCODING_RE.match(data)
+        if decl is not None and decl.group(1).lower() not in (b'utf-8', b'utf8'):
+            return None
+
+        raw_texts = _T_SIMPLE_RE.findall(data, 0, end)
+        # 자식 요소가 섞인 hp:t 가 하나라도 있으면 개수가 달라짐
+        if not raw_texts or len(raw_texts) != len(_T_OPEN_RE.findall(data, 0, end)):
+            return None
+
+        texts = []
+        for raw in raw_texts:
+            if not raw:
+                continue
+            text = raw.decode('utf-8')
+            if '\r' in text:
+                # XML 파서와 동일한 줄바꿈 정규화
+                text = text.replace('\r\n', '\n').replace('\r', '\n')
+            if '&' in text:
+                refs = _XML_REF_RE.findall(text)
+                if len(refs) != text.count('&'):
+                    # 미리 정의되지 않은 엔티티는 파서에 맡김
+                    return None
+                text = _XML_REF_RE.sub(_unescape_ref, text)
+            texts.append(text)
+        return texts
+
+    def _expat_parser(self, texts):
+        # 트리를 만들지 않고 expat 콜백으로 hp:t 의 텍스트만 texts 에 모으는 파서
+        # (첫 자식 요소 전까지의 문자열 = element.text 와 동일)
+        parts = []
+        in_text = False
+        t_name = TAG_T[1:]  # namespace_separator='}' 일 때의 이름 : '<uri>}t'
+
+        def start_element(name, attrs):
+            nonlocal in_text
+            if name == t_name:
+                in_text = True
+                del parts[:]
+            else:
+                in_text = False
+
+        def end_element(name):
+            nonlocal in_text
+            if name == t_name and parts:
+                texts.append(''.join(parts))
+                del parts[:]
+            in_text = False
+
+        def character_data(text):
+            if in_text:
+                parts.append(text)
+
+        parser = expat.ParserCreate(namespace_separator='}')
+        # 연속된 문자 데이터를 버퍼에 모아 한 번에 전달 (콜백 횟수와 조각 문자열 할당 감소)
+        parser.buffer_text = True
+        parser.buffer_size = _EXPAT_BUFFER_SIZE
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.CharacterDataHandler = character_data
+        # 외부 엔티티 참조는 lxml / ElementTree 와 같이 파싱 오류로 처리 (0 을 돌려주면 expat 이 오류를 냄)
+        parser.ExternalEntityRefHandler = lambda context, base, system_id, public_id: 0
+        return parser
+
+    def _expat_texts(self, data, end):
+        # lxml 이 없을 때 : 섹션 bytes 전체를 expat 으로 한 번에 파싱
+        texts = []
+        parser = self._expat_parser(texts)
+        if end is not None and end < len(data):
+            # 마지막 </hp:t> 까지만 (복사 없이 memoryview 로) 넘기고 문서가 끝나지 않은 상태(isfinal=False)로 파싱을 멈춤
+            parser.Parse(memoryview(data)[:end], False)
+        else:
+            parser.Parse(data, True)
+        return texts
+
+    def _read_member(self, z, name):
+        info = z.getinfo(name)
+        # 일반적인 deflate / stored 항목은 ZipFile 의 읽기 루프를 거치지 않고 데이터를 한 번에 읽음
+        if info.compress_type in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED) and not info.flag_bits & _ZIP_FLAG_ENCRYPTED:
+            fp = z.fp
+            fp.seek(info.header_offset)
+            header = fp.read(_LOCAL_HEADER_SIZE)
+            if len(header) == _LOCAL_HEADER_SIZE and header[:4] == _ZIP_MAGIC:
+                name_len, extra_len = _LOCAL_HEADER_LENGTHS.unpack_from(header, 26)
+                fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_len + extra_len)
+                compressed = fp.read(info.compress_size)
+                if info.compress_type == zipfile.ZIP_STORED:
+                    return compressed
+                # 압축 해제 후 크기를 알고 있으므로 출력 버퍼를 정확히 한 번만 할당
+                return zlib.decompress(compressed, -15, info.file_size)
+
+        if isinstance(z.fp, mmap.mmap) and not hasattr(z.fp, 'seekable'):
+            # Python 3.13 미만의 mmap 에는 seekable() 이 없어 ZipFile.open 이 실패하므로 경로로 다시 열어서 읽음
+            with zipfile.ZipFile(self.hwpx, 'r') as z:
+                return self._read_member(z, name)
+
+        with z.open(name) as fp:
+            # 텍스트 추출에는 CRC 검증이 필요 없음 (손상되면 XML 파싱에서 실패)
+            # ZipExtFile 은 기대 CRC 가 None 이면 crc32 계산을 건너뜀
+            fp._expected_crc = None
+            return fp.read()
+
+    def _looks_like_zip(self):
+        # 앞 4바이트의 local file header 시그니처만 확인 (EOCD 역방향 탐색은 ZipFile 이 어차피 수행)
+        pos = self.hwpx.tell()
+        self.hwpx.seek(0)
+        head = self.hwpx.read(4)
+        self.hwpx.seek(pos)
+        return head == _ZIP_MAGIC
+
+    def invalidate(self):
+        # 파일 내용이 바뀐 경우 다음 extract_text 에서 다시 추출
+        self._cached_text = None
+
+    def _read_section(self):
+        if hasattr(self.hwpx, 'read'):
+            if not self._looks_like_zip():
+                raise _NotZipError("ZIP 파일이 아님")
+            with zipfile.ZipFile(self.hwpx, 'r') as z:
+                return self._read_member(z, self._section_name(z))
+
+        # 경로로 받은 파일은 mmap 으로 매핑해서 ZipFile 의 seek / read 가 시스템 콜 없이 페이지 캐시에서 복사되도록 함
+        with open(self.hwpx, 'rb') as fp:
+            if fp.read(4) != _ZIP_MAGIC:
+                raise _NotZipError("ZIP 파일이 아님")
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm, zipfile.ZipFile(mm, 'r') as z:
+                return self._read_member(z, self._section_name(z))
+
+    def _section_name(self, z):
+        # NameToInfo 는 ZipFile 이 이미 들고 있는 이름 -> ZipInfo dict
+        infos = z.NameToInfo
+        for name in self.CANDIDATES:
+            if name in infos:
+                return name
+        raise _NoSectionError("section 파일을 찾을 수 없습니다.")
+
+    def iter_text(self):
+        # hp:t 텍스트를 문서 순서대로 하나씩 돌려주는 generator (extract_text 의 한 줄 = 한 항목)
+        # 섹션을 통째로 풀지 않고 압축 해제와 파싱을 조각 단위로 진행하므로 메모리 사용량이 문서 크기와 무관함
+        # 실패하면 예외를 그대로 올림 (ZIP 이 아니거나 section 이 없으면 ValueError)
+        if hasattr(self.hwpx, 'read'):
+            if not self._looks_like_zip():
+                raise _NotZipError("ZIP 파일이 아님")
+        else:
+            with open(self.hwpx, 'rb') as fp:
+                if fp.read(4) != _ZIP_MAGIC:
+                    raise _NotZipError("ZIP 파일이 아님")
+
+        # ZipFile.open 으로 스트리밍하므로 mmap 은 쓰지 않음 (Python 3.13 미만의 mmap 은 seekable() 이 없음)
+        with zipfile.ZipFile(self.hwpx, 'r') as z, z.open(self._section_name(z)) as fp:
+            # 텍스트 추출에는 CRC 검증이 필요 없음 (_read_member 와 동일)
+            fp._expected_crc = None
+            if etree is not None:
+                yield from self._iter_lxml_texts(fp)
+            else:
+                yield from self._iter_expat_texts(fp)
+
+    def _iter_lxml_texts(self, fp):
+        # hp:t 가 닫힐 때마다 텍스트를 내보내고, 다 본 요소는 트리에서 떼어내 메모리에 쌓이지 않게 함
+        for _, elem in _lxml_safe(etree.iterparse(fp, events=('end',), tag=TAG_T, **_LXML_OPTIONS)):
+            if elem.text:
+                yield elem.text
+            elem.clear(keep_tail=True)
+            # 자신과 조상들의 앞쪽 형제(이미 끝난 문단, 표 등) 삭제
+            for node in itertools.chain((elem,), elem.iterancestors()):
+                parent = node.getparent()
+                while parent is not None and node.getprevious() is not None:
+                    del parent[0]
+
+    def _iter_expat_texts(self, fp):
+        # 압축 해제한 조각을 expat 에 차례로 넣고, 조각 사이사이 모인 텍스트를 내보냄
+        texts = []
+        parser = self._expat_parser(texts)
+        while True:
+            chunk = fp.read(_STREAM_CHUNK_SIZE)
+            parser.Parse(chunk, not chunk)
+            yield from texts
+            del texts[:]
+            if not chunk:
+                break
 
     def extract_text(self):
+        if self._cached_text is not None:
+            return self._cached_text
+
         try:
-            if zipfile.is_zipfile(self.hwpx):
-                with zipfile.ZipFile(self.hwpx, 'r') as z:
-                    try:
-                        with z.open('Contents/section0.xml') as section_xml:
-                            tree = ET.parse(section_xml)
-                            root = tree.getroot()
-                            texts = []
-                            for paragraph in root.findall('.//hp:p', self.namespaces):
-                                for run in paragraph.findall('.//hp:run', self.namespaces):
-                                    element = run.find('hp:t', self.namespaces)
-                                    if element is not None and element.text is not None:
-                                        texts.append(element.text)
-                            return '\n'.join(texts)
-                    except KeyError:
-                        try:
-                            with z.open('BodyText/section0.xml') as section_xml:
-                                tree = ET.parse(section_xml)
-                                root = tree.getroot()
-                                texts = []
-                                for paragraph in root.findall('.//hp:p', self.namespaces):
-                                    for run in paragraph.findall('.//hp:run', self.namespaces):
-                                        element = run.find('hp:t', self.namespaces)
-                                        if element is not None and element.text is not None:
-                                            texts.append(element.text)
-                                return '\n'.join(texts)
-                        except KeyError:
-                            try:
-                                with z.open('Contents/content.hpf') as hpf_file:
-                                    tree = ET.parse(section_xml)
-                                    root = tree.getroot()
-                                    texts = []
-                                    for paragraph in root.findall('.//hp:p', self.namespaces):
-                                        for run in paragraph.findall('.//hp:run', self.namespaces):
-                                            element = run.find('hp:t', self.namespaces)
-                                            if element is not None and element.text is not None:
-                                                texts.append(element.text)
-                                    return '\n'.join(texts)
-                            except KeyError:
-                                return "ERROR :: .hwpx 텍스트 추출 오류 > section 파일을 찾을 수 없습니다."
-            else:
-                # ZIP 파일이 아닌 경우 파일을 직접 읽어 처리 (추가 로직 필요)
-                return "INFO :: .hwpx 텍스트 추출 > ZIP 파일이 아님. 추가 처리 필요."
+            # 전체 bytes 를 한 번에 처리하는 경로 (정규식 fast path 사용 가능)
+            self._cached_text = '\n'.join(self._texts(self._read_section()))
+            return self._cached_text
+        except _NotZipError:
+            # ZIP 파일이 아닌 경우 파일을 직접 읽어 처리 (추가 로직 필요)
+            return "INFO :: .hwpx 텍스트 추출 > ZIP 파일이 아님. 추가 처리 필요."
+        except _NoSectionError:
+            return "ERROR :: .hwpx 텍스트 추출 오류 > section 파일을 찾을 수 없습니다."
         except Exception as e:
             return f"ERROR :: .hwpx 텍스트 추출 오류 > {str(e)}"
-            
-            
\ No newline at end of file
+
+def _extract_one(file):
+    return hwpxExtractor(file).extract_text()
+
+def extract_many(files, workers=None):
+    # 여러 .hwpx 파일을 스레드 풀로 동시에 추출 (파일 읽기 / zlib 압축 해제 / lxml 파싱은 GIL 을 놓음)
+    # 결과는 입력 순서대로 반환
+    if workers is None:
+        workers = os.cpu_count()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_extract_one, files))
\ No newline at end of file